@@ -47,7 +47,19 @@ MAX_LEN = 50
 peprec_file = open(args.fasta_file.replace('.fasta', '.PEPREC'), 'wt')
 peprec_file.write('spec_id modifications peptide charge protein\n')
 
-n_prots = (sum(1 for x in SeqIO.parse(open(args.fasta_file),'fasta')))
+def count_fasta_records(fasta_file, chunk_size=1 << 20):
+    # Count header lines with bytes.count instead of parsing all records
+    n_records = 0
+    previous = b'\n'
+    with open(fasta_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            n_records += chunk.count(b'\n>')
+            if previous == b'\n' and chunk.startswith(b'>'):
+                n_records += 1
+            previous = chunk[-1:]
+    return n_records
+
+n_prots = count_fasta_records(args.fasta_file)
 print('{} proteins in fasta file \n'.format(n_prots))
 
 fasta_sequences = SeqIO.parse(open(args.fasta_file),'fasta')
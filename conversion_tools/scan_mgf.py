@@ -14,6 +14,7 @@ __email__ = "Ralf.Gabriels@ugent.be"
 import argparse
 import mmap
 import os
+import re
 
 import pandas as pd
 
@@ -24,6 +25,17 @@ except ImportError:
 else:
     USE_TQDM = True
 
+try:
+    import hyperscan
+except ImportError:
+    USE_HYPERSCAN = False
+else:
+    USE_HYPERSCAN = True
+
+
+# Peak lines with zero intensity, including their line ending
+ZERO_INTENSITY_PEAK_RE = re.compile(rb"(?m)^[0-9][^\n]*[ \t]0\.0[ \t]*\r?\n")
+
 
 def argument_parser():
     parser = argparse.ArgumentParser(
@@ -50,13 +62,89 @@ def argument_parser():
     return args
 
 
-def get_num_lines(file_path):
-    fp = open(file_path, "r+")
-    buf = mmap.mmap(fp.fileno(), 0)
-    lines = 0
-    while buf.readline():
-        lines += 1
-    return lines
+def _iter_matching_spectra(mgf_buffer, target_titles, progress=None):
+    """
+    Yield (start, stop) byte offsets of the spectra in an MGF file buffer of which
+    the title is in `target_titles`.
+    """
+    pos = 0
+    while True:
+        title_line = mgf_buffer.find(b"\nTITLE=", pos)
+        if title_line == -1:
+            break
+        title_end = mgf_buffer.find(b"\n", title_line + 1)
+        end_ions = mgf_buffer.find(b"END IONS", title_end)
+        if title_end == -1 or end_ions == -1:
+            break
+        stop = mgf_buffer.find(b"\n", end_ions)
+        stop = len(mgf_buffer) if stop == -1 else stop + 1
+
+        title = mgf_buffer[title_line + 7 : title_end].strip().decode()
+        if title in target_titles:
+            start = mgf_buffer.rfind(b"BEGIN IONS", pos, title_line)
+            yield title_line + 1 if start == -1 else start, stop
+
+        if progress is not None:
+            progress.update(stop - pos)
+        pos = stop
+
+
+def _spectrum_bounds(mgf_buffer, title_line):
+    """Get (start, stop) byte offsets of the spectrum with the given title line."""
+    prev_end_ions = mgf_buffer.rfind(b"END IONS", 0, title_line)
+    start = mgf_buffer.rfind(b"BEGIN IONS", max(prev_end_ions, 0), title_line)
+    if start == -1:
+        start = title_line + 1
+    end_ions = mgf_buffer.find(b"END IONS", title_line)
+    if end_ions == -1:
+        return start, None
+    stop = mgf_buffer.find(b"\n", end_ions)
+    stop = len(mgf_buffer) if stop == -1 else stop + 1
+    return start, stop
+
+
+def _iter_matching_spectra_hyperscan(
+    mgf_buffer, target_titles, progress=None, chunk_size=1 << 24
+):
+    """
+    Yield (start, stop) byte offsets of the spectra in an MGF file buffer of which
+    the title is in `target_titles`, by matching all titles at once with Hyperscan.
+    """
+    if not target_titles:
+        return
+    titles = list(target_titles)
+    database = hyperscan.Database(mode=hyperscan.HS_MODE_STREAM)
+    database.compile(
+        expressions=[
+            rb"^TITLE=[ \t]*" + re.escape(title).encode() + rb"[ \t\r]*$"
+            for title in titles
+        ],
+        ids=list(range(len(titles))),
+        flags=[hyperscan.HS_FLAG_MULTILINE] * len(titles),
+    )
+
+    # Hyperscan reports the end offset of each matching title line
+    match_ends = []
+
+    def on_match(pattern_id, start, end, flags, context):
+        match_ends.append(end)
+
+    with database.stream(match_event_handler=on_match) as stream:
+        for chunk_start in range(0, len(mgf_buffer), chunk_size):
+            chunk = mgf_buffer[chunk_start : chunk_start + chunk_size]
+            stream.scan(chunk)
+            if progress is not None:
+                progress.update(len(chunk))
+
+    for match_end in sorted(match_ends):
+        title_line = mgf_buffer.rfind(b"\n", 0, match_end)
+        if title_line == -1:
+            # Title on the first line, without BEGIN IONS; also skipped by find path
+            continue
+        start, stop = _spectrum_bounds(mgf_buffer, title_line)
+        if stop is None:
+            break
+        yield start, stop
 
 
 def scan_mgf(
@@ -72,10 +160,24 @@ def scan_mgf(
     else:
         file_suffix = ".mgf"
 
-    with open(outname, "w") as out:
+    with open(outname, "wb", buffering=1 << 20) as out:
         count_runs = 0
         count = 0
-        runs = df_in[filename_col].unique()
+        # Group and deduplicate on categorical codes instead of on the strings
+        runs = df_in[filename_col].astype("category")
+        titles = df_in[spec_title_col].astype("category")
+        # MGF titles are read as strings, so compare against string spectrum IDs
+        title_categories = titles.cat.categories.astype(str)
+        title_codes = pd.Series(titles.cat.codes.to_numpy(), index=runs.cat.codes)
+        # Code -1 marks missing values, which cannot match any run or title
+        title_codes = title_codes[(title_codes.index >= 0) & (title_codes >= 0)]
+        target_titles_per_run = {
+            runs.cat.categories[run_code]: frozenset(
+                title_categories[codes.unique()]
+            )
+            for run_code, codes in title_codes.groupby(level=0, sort=False)
+        }
+        runs = list(target_titles_per_run)
         print(
             "Scanning MGF files: {} runs to do. Now working on run: ".format(len(runs)),
             end="",
@@ -87,34 +189,40 @@ def scan_mgf(
             else:
                 print(".", end="")
 
-            spec_dict = dict(
-                (v, k)
-                for k, v in df_in[(df_in[filename_col] == run)][spec_title_col]
-                .to_dict()
-                .items()
-            )
+            target_titles = target_titles_per_run[run]
 
-            found = False
             current_mgf_file = "{}/{}{}".format(mgf_folder, str(run), file_suffix)
-            with open(current_mgf_file, "r") as f:
+            # Empty files cannot be memory-mapped, and contain no spectra
+            if os.path.getsize(current_mgf_file) == 0:
+                continue
+            with open(current_mgf_file, "rb") as f, mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mm:
                 if use_tqdm:
-                    mgf_iterator = tqdm(f, total=get_num_lines(current_mgf_file))
+                    progress = tqdm(total=len(mm), unit="B", unit_scale=True)
+                else:
+                    progress = None
+                if USE_HYPERSCAN:
+                    matching_spectra = _iter_matching_spectra_hyperscan(
+                        mm, target_titles, progress
+                    )
                 else:
-                    mgf_iterator = f
-                for line in mgf_iterator:
-                    if "TITLE" in line:
-                        title = line[6:].strip()
-                        if title in spec_dict:
-                            found = True
-                            out.write("BEGIN IONS\n")
-                            # line = "TITLE=" + str(spec_dict[title]) + "\n"
-                            count += 1
-                    if "END IONS" in line:
-                        if found:
-                            out.write(line + "\n")
-                            found = False
-                    if found and line[-4:] != "0.0\n":
-                        out.write(line)
+                    matching_spectra = _iter_matching_spectra(
+                        mm, target_titles, progress
+                    )
+                # Collect spectra and write them in batches of 1000
+                spectra = []
+                for start, stop in matching_spectra:
+                    # Skip peaks with zero intensity
+                    spectra.append(ZERO_INTENSITY_PEAK_RE.sub(b"", mm[start:stop]))
+                    spectra.append(b"\n")
+                    count += 1
+                    if count % 1000 == 0:
+                        out.write(b"".join(spectra))
+                        spectra.clear()
+                out.write(b"".join(spectra))
+                if progress is not None:
+                    progress.close()
 
     print(
         "\n{}/{} spectra found and written to new MGF file.".format(count, len(df_in))
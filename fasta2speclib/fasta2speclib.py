@@ -329,9 +329,8 @@ class Fasta2SpecLib:
         if self.config.min_precursor_mz and self.config.max_precursor_mz:
             mods = MS2PIPModifications()
             mods.add_from_ms2pip_modstrings(self.ms2pip_params["ms2pip"]["ptm"])
-            precursor_mz = peprec.apply(
-                lambda x: mods.calc_precursor_mz(x["peptide"], x["modifications"], x["charge"])[1],
-                axis=1,
+            _, precursor_mz = mods.calc_precursor_mz_batch(
+                peprec["peptide"], peprec["modifications"], peprec["charge"]
             )
             before = len(peprec)
             peprec = (
@@ -61,6 +61,23 @@ def get_vector(np.ndarray[unsigned short, ndim=1, mode="c"] peptide,
 	return r
 
 
+def get_vector_into(np.ndarray[unsigned short, ndim=1, mode="c"] peptide,
+					np.ndarray[unsigned short, ndim=1, mode="c"] modpeptide,
+					charge,
+					np.ndarray[unsigned short, ndim=2, mode="c"] out):
+
+	cdef unsigned int* results = get_v_ms2pip(len(peptide)-2, &peptide[0], &modpeptide[0], charge)
+
+	cdef Py_ssize_t num_ions = len(peptide) - 3
+	cdef Py_ssize_t fnum = results[0] // num_ions
+	cdef Py_ssize_t i, j
+	if out.shape[0] != num_ions or out.shape[1] != fnum:
+		raise ValueError("Output array shape does not match number of ions and features")
+	for i in range(num_ions):
+		for j in range(fnum):
+			out[i, j] = results[j + 1 + i * fnum]
+
+
 def get_vector_ce(np.ndarray[unsigned short, ndim=1, mode="c"] peptide,
 			   np.ndarray[unsigned short, ndim=1, mode="c"] modpeptide,
 			   charge, ce):
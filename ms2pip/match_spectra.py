@@ -44,9 +44,10 @@ class MatchSpectra:
             Modifications used in PEPREC file
         pepids: Iterable[str]
             Iterable of spec_id's from peprec input ordered matching the predictions
-        predicted_mzs: Iterable[list[numpy.array[float32]]]
-            Iterable of predicted m/z values
-        predicted_mzs: Iterable[list[numpy.array[float32]]]
+        predicted_mzs: Iterable[numpy.array[float32]]
+            Iterable of predicted m/z values, one flat array with all ion types per
+            peptide
+        predicted_intensities: Iterable[list[numpy.array[float32]]]
             Iterable of predicted intensities
         """
         self.peprec = peprec
@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+import array
 import csv
 import glob
 import itertools
@@ -17,7 +18,6 @@ from rich.progress import track
 from ms2pip.cython_modules import ms2pip_pyx
 from ms2pip.exceptions import (
     FragmentationModelRequiredError,
-    InvalidModificationFormattingError,
     InvalidPEPRECError,
     MissingConfigurationError,
     NoMatchingSpectraFound,
@@ -30,7 +30,13 @@ from ms2pip.exceptions import (
 from ms2pip.feature_names import get_feature_names_new
 from ms2pip.match_spectra import MatchSpectra
 from ms2pip.ms2pip_tools import calc_correlations, spectrum_output
-from ms2pip.peptides import AMINO_ACID_IDS, Modifications, write_amino_acid_masses
+from ms2pip.peptides import (
+    Modifications,
+    _parse_modifications,
+    encode_peptide,
+    encode_peptidoforms,
+    write_amino_acid_masses,
+)
 from ms2pip.predict_xgboost import get_predictions_xgb, validate_requested_xgb_model
 from ms2pip.retention_time import RetentionTime
 from ms2pip.spectrum import read_spectrum_file
@@ -194,84 +200,64 @@ def process_peptides(worker_num, data, afile, modfile, modfile2, PTMmap, model):
 
     ms2pip_pyx.ms2pip_init(afile, modfile, modfile2)
 
+    model_id = MODELS[model]["id"]
+    peaks_version = MODELS[model]["peaks_version"]
+    use_xgboost = "xgboost_model_files" in MODELS[model].keys()
+
+    # Peptides longer then 101 lead to "Segmentation fault (core dumped)"
+    data = data[data["peptide"].str.len() <= 100]
+
     # Prepare output variables
-    pepid_buf = []
-    peplen_buf = []
-    charge_buf = []
-    mz_buf = []
+    pepid_buf = data["spec_id"].tolist()
+    peplen_buf = data["peptide"].str.len().tolist()
+    charge_buf = data["charge"].tolist()
+    # All ion m/z values are collected in a single flat float32 buffer
+    mz_flat = array.array("f")
     target_buf = None
     prediction_buf = []
     vector_buf = []
 
-    # transform pandas dataframe into dictionary for easy access
-    if "ce" in data.columns:
-        specdict = (
-            data[["spec_id", "peptide", "modifications", "charge", "ce"]]
-            .set_index("spec_id")
-            .to_dict()
-        )
-        ces = specdict["ce"]
-    else:
-        specdict = (
-            data[["spec_id", "peptide", "modifications", "charge"]]
-            .set_index("spec_id")
-            .to_dict()
+    # Encode peptides and apply modifications for all peptides at once; convert
+    # peptide strings to integer arrays to speed up C code
+    charges = data["charge"].to_numpy(dtype=np.int32)
+    # TODO: Check if 30 is good default CE!
+    ces = data["ce"].tolist() if "ce" in data.columns else [30] * len(data)
+    encoded_peptides, encoded_modpeptides = encode_peptidoforms(
+        data["peptide"], data["modifications"].str.split("|"), PTMmap
+    )
+    # Row views up to each peptide's length are C-contiguous, as the C code requires
+    peptides = [row[: n + 2] for row, n in zip(encoded_peptides, peplen_buf)]
+    modpeptides = [row[: n + 2] for row, n in zip(encoded_modpeptides, peplen_buf)]
+
+    # Preallocate feature vectors for all ions of all peptides
+    if use_xgboost:
+        num_ions = np.array(peplen_buf, dtype=np.intp) - 1
+        vector_offsets = np.concatenate([[0], np.cumsum(num_ions)])
+        feature_vectors = np.empty(
+            (vector_offsets[-1], len(get_feature_names_new())), dtype=np.uint16
         )
-    pepids = data["spec_id"].tolist()
-    peptides = specdict["peptide"]
-    modifications = specdict["modifications"]
-    charges = specdict["charge"]
-    del specdict
+        vector_buf.append(feature_vectors)
 
     # Track progress for only one worker (good approximation of all workers' progress)
-    for pepid in track(
-        pepids,
-        total=len(pepids),
+    for i, (peptide, modpeptide, ch, colen) in track(
+        enumerate(zip(peptides, modpeptides, charges, ces)),
+        total=len(peptides),
         disable=worker_num != 0,
         transient=True,
         description="",
     ):
-        peptide = peptides[pepid]
-        peptide = peptide.replace("L", "I")
-        mods = modifications[pepid]
-
-        # TODO: Check if 30 is good default CE!
-        colen = 30
-        if "ce" in data.columns:
-            colen = ces[pepid]
-
-        # Peptides longer then 101 lead to "Segmentation fault (core dumped)"
-        if len(peptide) > 100:
-            continue
-
-        # convert peptide string to integer list to speed up C code
-        peptide = np.array(
-            [0] + [AMINO_ACID_IDS[x] for x in peptide] + [0], dtype=np.uint16
-        )
-        modpeptide = apply_mods(peptide, mods, PTMmap)
-
-        pepid_buf.append(pepid)
-        peplen = len(peptide) - 2
-        peplen_buf.append(peplen)
-
-        ch = charges[pepid]
-        charge_buf.append(ch)
-
-        model_id = MODELS[model]["id"]
-        peaks_version = MODELS[model]["peaks_version"]
-
         # get ion mzs
-        mzs = ms2pip_pyx.get_mzs(modpeptide, peaks_version)
-        mz_buf.append([np.array(m, dtype=np.float32) for m in mzs])
+        for m in ms2pip_pyx.get_mzs(modpeptide, peaks_version):
+            mz_flat.extend(m)
 
         # If using xgboost model file, get feature vectors to predict outside of MP.
         # Predictions will be added in `_merge_predictions` function.
-        if "xgboost_model_files" in MODELS[model].keys():
-            vector_buf.append(
-                np.array(
-                    ms2pip_pyx.get_vector(peptide, modpeptide, ch),
-                    dtype=np.uint16,
-                )
+        if use_xgboost:
+            ms2pip_pyx.get_vector_into(
+                peptide,
+                modpeptide,
+                ch,
+                feature_vectors[vector_offsets[i] : vector_offsets[i + 1]],
             )
         else:
             predictions = ms2pip_pyx.get_predictions(
@@ -279,6 +265,8 @@ def process_peptides(worker_num, data, afile, modfile, modfile2, PTMmap, model):
             )
             prediction_buf.append([np.array(p, dtype=np.float32) for p in predictions])
 
+    mz_buf = [np.frombuffer(mz_flat, dtype=np.float32)]
+
     return (
         pepid_buf,
         peplen_buf,
@@ -347,7 +335,7 @@ def process_spectra(
     pepid_buf = []
     peplen_buf = []
     charge_buf = []
-    mz_buf = []
+    mz_flat = array.array("f")
     target_buf = []
     prediction_buf = []
     vector_buf = []
@@ -377,7 +365,6 @@ def process_spectra(
             continue
 
         peptide = peptides[title]
-        peptide = peptide.replace("L", "I")
         mods = modifications[title]
 
         if spectrum.precursor_charge:
@@ -393,9 +380,7 @@ def process_spectra(
             continue
 
         # convert peptide string to integer list to speed up C code
-        peptide = np.array(
-            [0] + [AMINO_ACID_IDS[x] for x in peptide] + [0], dtype=np.uint16
-        )
+        peptide = encode_peptide(peptide)
 
         try:
             modpeptide = apply_mods(peptide, mods, PTMmap)
@@ -479,8 +464,8 @@ def process_spectra(
                 peaks_version,
             )
             target_buf.append([np.array(t, dtype=np.float32) for t in targets])
-            mzs = ms2pip_pyx.get_mzs(modpeptide, peaks_version)
-            mz_buf.append([np.array(m, dtype=np.float32) for m in mzs])
+            for m in ms2pip_pyx.get_mzs(modpeptide, peaks_version):
+                mz_flat.extend(m)
 
             # If using xgboost model file, get feature vectors to predict outside of MP.
             # Predictions will be added in `_merge_predictions` function.
@@ -514,6 +499,7 @@ def process_spectra(
         return psmids, df, dtargets
 
     # Else, return general data
+    mz_buf = [np.frombuffer(mz_flat, dtype=np.float32)]
     return (
         pepid_buf,
         peplen_buf,
@@ -554,22 +540,8 @@ def apply_mods(peptide, mods, PTMmap):
     version are hard coded in ms2pipfeatures_c.c for now.
     """
     modpeptide = np.array(peptide[:], dtype=np.uint16)  # Copy to avoid inplace changes
-    if mods != "-":
-        l = mods.split("|")
-        if len(l) % 2 != 0:
-            raise InvalidModificationFormattingError(mods)
-        for i in range(0, len(l), 2):
-            tl = l[i + 1]
-            try:
-                mod = PTMmap[tl]
-            except:
-                raise UnknownModificationError(tl)
-            try:
-                modpeptide[int(l[i])] = mod
-            except IndexError:
-                raise InvalidModificationFormattingError(
-                    f"Amino acid position not in peptide for modifications: `{mods}`"
-                )
+    positions, mod_ids = _parse_modifications(mods.split("|"), len(peptide) - 2, PTMmap)
+    modpeptide[positions] = mod_ids
 
     return modpeptide
 
@@ -1008,19 +980,22 @@ class MS2PIP:
                 vector_bufs.extend(vector_buf)
 
         # Validate number of results
-        if not mz_bufs:
+        if not peplen_bufs:
             raise NoMatchingSpectraFound(
                 "No spectra matching titles/IDs from PEPREC could be found in "
                 "provided spectrum file."
             )
-        logger.debug(f"Gathered data for {len(mz_bufs)} peptides/spectra.")
+        logger.debug(f"Gathered data for {len(peplen_bufs)} peptides/spectra.")
 
         # If XGBoost model files are used, first predict outside of MP
         # Temporary hack to move XGB prediction step out of MP; ultimately does not
         # make sense to do this in the `_merge_predictions` step...
         if "xgboost_model_files" in MODELS[self.model].keys():
             logger.debug("Converting feature vectors to XGBoost DMatrix...")
-            xgb_vector = xgb.DMatrix(np.vstack(vector_bufs))
+            if len(vector_bufs) == 1:
+                xgb_vector = xgb.DMatrix(vector_bufs[0])
+            else:
+                xgb_vector = xgb.DMatrix(np.vstack(vector_bufs))
             num_ions = [l - 1 for l in peplen_bufs]
             prediction_bufs = get_predictions_xgb(
                 xgb_vector,
@@ -1079,13 +1054,22 @@ class MS2PIP:
         spec_out.write_results(self.out_formats)
 
     def _match_spectra(self, results):
-        mz_bufs, prediction_bufs, _, _, _, pepid_bufs = zip(*(r.get() for r in results))
+        pepid_bufs, peplen_bufs, _, mz_bufs, _, prediction_bufs, _ = zip(
+            *(r.get() for r in results)
+        )
+
+        # Split flat m/z buffers into views per peptide
+        num_ion_types = len(MODELS[self.model]["ion_types"])
+        peplens = np.fromiter(itertools.chain.from_iterable(peplen_bufs), dtype=int)
+        mz_offsets = np.cumsum(num_ion_types * (peplens - 1))
+        mz_flat = np.concatenate(list(itertools.chain.from_iterable(mz_bufs)))
+        mzs = np.split(mz_flat, mz_offsets[:-1])
 
         match_spectra = MatchSpectra(
             self.data,
             self.mods,
             itertools.chain.from_iterable(pepid_bufs),
-            itertools.chain.from_iterable(mz_bufs),
+            mzs,
             itertools.chain.from_iterable(prediction_bufs),
         )
         if self.spec_files:
@@ -448,11 +448,10 @@ class SpectrumOutput:
             ),
             axis=1,
         )
-        spectronaut_peprec["PrecursorMz"] = spectronaut_peprec.apply(
-            lambda row: self.mods.calc_precursor_mz(
-                row["peptide"], row["modifications"], row["charge"]
-            )[1],
-            axis=1,
+        _, spectronaut_peprec["PrecursorMz"] = self.mods.calc_precursor_mz_batch(
+            spectronaut_peprec["peptide"],
+            spectronaut_peprec["modifications"],
+            spectronaut_peprec["charge"],
         )
         spectronaut_peprec["ModifiedPeptide"] = (
             "_" + spectronaut_peprec["ModifiedPeptide"] + "_"
@@ -5,9 +5,14 @@ MS2PIP / PEPREC modification handling
 import itertools
 import tempfile
 
+import numpy as np
 from pyteomics import mass
 
-from ms2pip.exceptions import InvalidAminoAcidError
+from ms2pip.exceptions import (
+    InvalidAminoAcidError,
+    InvalidModificationFormattingError,
+    UnknownModificationError,
+)
 
 AMINO_ACIDS = [
     "A",
@@ -58,6 +63,23 @@ AMINO_ACID_IDS = {a: i for i, a in enumerate(AMINO_ACIDS)}
 
 PROTON_MASS = 1.007825032070059
 
+# Lookup table from ASCII byte to amino acid ID; unknown residues map to sentinel
+_AA_LUT_SENTINEL = 0xFFFF
+_AA_LUT = np.full(256, _AA_LUT_SENTINEL, dtype=np.uint16)
+for _aa, _aa_id in AMINO_ACID_IDS.items():
+    _AA_LUT[ord(_aa)] = _aa_id
+    _AA_LUT[ord(_aa.lower())] = _aa_id
+_AA_LUT[ord("L")] = _AA_LUT[ord("l")] = AMINO_ACID_IDS["I"]
+
+# Lookup table from ASCII byte to residue mass, identical to pyteomics.mass.fast_mass;
+# lowercase residues are accepted, as in `_AA_LUT`
+_AA_MASS_LUT = np.full(256, np.nan, dtype=np.float64)
+for _aa, _aa_mass in mass.std_aa_mass.items():
+    _AA_MASS_LUT[ord(_aa)] = _aa_mass
+    _AA_MASS_LUT[ord(_aa.lower())] = _aa_mass
+_WATER_MASS = mass.nist_mass["H"][0][0] * 2 + mass.nist_mass["O"][0][0]
+del _aa, _aa_id, _aa_mass
+
 
 class Modifications:
     def __init__(self):
@@ -66,6 +88,7 @@ class Modifications:
         """
         self.modifications = {}
         self._mass_shifts = None
+        self._mass_shift_vector = None
         self._ptm_ids = None
         self._next_mod_id = 38  # Omega compatibility (mutations)
 
@@ -115,6 +138,8 @@ class Modifications:
             self._next_mod_id += 1
 
         self._mass_shifts = None
+        self._mass_shift_vector = None
+        self._ptm_ids = None
 
     @property
     def _all_modifications(self):
@@ -127,7 +152,7 @@ class Modifications:
         """
         Return modification name -> mass shift mapping.
         """
-        if not self._mass_shifts:
+        if self._mass_shifts is None:
             self._mass_shifts = {
                 name: mod["mass_shift"] for name, mod in self._all_modifications
             }
@@ -138,12 +163,23 @@ class Modifications:
         """
         Return modification name -> modification id mapping.
         """
-        if not self._ptm_ids:
+        if self._ptm_ids is None:
             self._ptm_ids = {
                 name: mod["mod_id"] for name, mod in self._all_modifications
             }
         return self._ptm_ids
 
+    @property
+    def mass_shift_vector(self):
+        """
+        Return array of mass shifts, indexed by modification id.
+        """
+        if self._mass_shift_vector is None:
+            self._mass_shift_vector = np.zeros(self._next_mod_id, dtype=np.float64)
+            for _, mod in self._all_modifications:
+                self._mass_shift_vector[mod["mod_id"]] = mod["mass_shift"]
+        return self._mass_shift_vector
+
     def write_modifications_file(self, mod_type="ptm"):
         mod_file = tempfile.NamedTemporaryFile(delete=False, mode="w", newline="\n")
         mod_file.write("{}\n".format(len(self.modifications[mod_type])))
@@ -189,6 +225,220 @@ class Modifications:
         prec_mz = (prec_mass + charge * PROTON_MASS) / charge
         return prec_mass, prec_mz
 
+    def calc_precursor_mz_batch(self, peptides, modifications, charges):
+        """
+        Calculate precursor masses and mzs for multiple peptides at once, taking the
+        modifications into account.
+
+        Parameters
+        ----------
+        peptides: list-like of str
+            stripped peptide sequences
+
+        modifications: list-like of str
+            MS2PIP-style formatted modification lists (e.g. `0|Acetyl|2|Oxidation`)
+
+        charges: list-like of int
+            precursor charges
+
+        Returns
+        -------
+        prec_masses, prec_mzs: tuple(np.ndarray, np.ndarray)
+        """
+        charges = np.asarray(charges, dtype=np.float64)
+        unmodified_masses = calc_peptide_masses(peptides)
+
+        ptm_ids = self.ptm_ids
+        mod_ids = [
+            [ptm_ids[mod] for mod in mods.split("|")[1::2]] for mods in modifications
+        ]
+        peptide_index = np.repeat(np.arange(len(mod_ids)), [len(m) for m in mod_ids])
+        mod_ids = np.fromiter(
+            itertools.chain.from_iterable(mod_ids),
+            dtype=np.intp,
+            count=len(peptide_index),
+        )
+        mods_masses = np.bincount(
+            peptide_index,
+            weights=self.mass_shift_vector[mod_ids],
+            minlength=len(charges),
+        )
+
+        prec_masses = unmodified_masses + mods_masses
+        prec_mzs = (prec_masses + charges * PROTON_MASS) / charges
+        return prec_masses, prec_mzs
+
+
+def _lookup_residues(peptides, lut):
+    """
+    Look up all residues of multiple peptides at once in an ASCII lookup table.
+
+    Parameters
+    ----------
+    peptides: list of str
+        stripped peptide sequences
+    lut: np.ndarray
+        lookup table from ASCII byte to value; unknown residues map to NaN for float
+        tables, or to `_AA_LUT_SENTINEL` otherwise
+
+    Returns
+    -------
+    values, peptide_index: tuple(np.ndarray, np.ndarray)
+        looked up values for all residues of all peptides, and the index of the
+        peptide that each residue belongs to
+
+    Raises
+    ------
+    InvalidAminoAcidError
+        for the first peptide with a residue that is not in the lookup table
+
+    """
+    try:
+        residues = np.frombuffer("".join(peptides).encode("ascii"), dtype=np.uint8)
+    except UnicodeEncodeError:
+        raise InvalidAminoAcidError(next(p for p in peptides if not p.isascii()))
+    values = lut[residues]
+    peptide_index = np.repeat(
+        np.arange(len(peptides)), [len(peptide) for peptide in peptides]
+    )
+    invalid = np.isnan(values) if lut.dtype.kind == "f" else values == _AA_LUT_SENTINEL
+    if invalid.any():
+        raise InvalidAminoAcidError(peptides[peptide_index[invalid.argmax()]])
+    return values, peptide_index
+
+
+def _parse_modifications(mods, peptide_length, ptm_ids):
+    """
+    Parse an MS2PIP-style modification list for a single peptide.
+
+    Parameters
+    ----------
+    mods: list of str
+        MS2PIP-style formatted modification list, split on `|` (e.g.
+        `["0", "Acetyl", "2", "Oxidation"]`)
+    peptide_length: int
+        length of the stripped peptide sequence
+    ptm_ids: dict
+        modification name -> modification id mapping
+
+    Returns
+    -------
+    positions, mod_ids: tuple(list[int], list[int])
+        positions in the encoded peptide (see `encode_peptide`) and modification ids
+
+    """
+    if mods == ["-"]:
+        return [], []
+    if len(mods) % 2 != 0:
+        raise InvalidModificationFormattingError("|".join(mods))
+    try:
+        mod_ids = [ptm_ids[name] for name in mods[1::2]]
+    except KeyError as e:
+        raise UnknownModificationError(e.args[0])
+    positions = []
+    for location in mods[0::2]:
+        location = int(location)
+        if not -(peptide_length + 2) <= location < peptide_length + 2:
+            raise InvalidModificationFormattingError(
+                "Amino acid position not in peptide for modifications: "
+                f"`{'|'.join(mods)}`"
+            )
+        positions.append(location % (peptide_length + 2))
+    return positions, mod_ids
+
+
+def calc_peptide_masses(peptides):
+    """
+    Calculate unmodified monoisotopic masses for multiple peptides at once.
+
+    Parameters
+    ----------
+    peptides: list-like of str
+        stripped peptide sequences
+
+    Returns
+    -------
+    masses: np.ndarray
+    """
+    peptides = list(peptides)
+    residue_masses, peptide_index = _lookup_residues(peptides, _AA_MASS_LUT)
+    return (
+        np.bincount(peptide_index, weights=residue_masses, minlength=len(peptides))
+        + _WATER_MASS
+    )
+
+
+def encode_peptide(peptide):
+    """
+    Encode peptide sequence as array of amino acid IDs, padded with zeros.
+
+    Leucine is encoded as isoleucine, and lowercase residues are accepted.
+
+    Parameters
+    ----------
+    peptide: str
+        stripped peptide sequence
+
+    Returns
+    -------
+    encoded_peptide: np.ndarray
+        `np.uint16` array of length `len(peptide) + 2`
+
+    """
+    amino_acid_ids, _ = _lookup_residues([peptide], _AA_LUT)
+    encoded_peptide = np.zeros(len(amino_acid_ids) + 2, dtype=np.uint16)
+    encoded_peptide[1:-1] = amino_acid_ids
+    return encoded_peptide
+
+
+def encode_peptidoforms(peptides, modifications, ptm_ids):
+    """
+    Encode multiple peptide sequences and their modifications at once.
+
+    All residues are encoded in a single lookup and all modifications are set in a
+    single assignment, directly into preallocated arrays. Row `i` holds peptide `i`
+    in its first `len(peptides[i]) + 2` columns, which is identical to the output
+    of `encode_peptide` and `ms2pip.ms2pipC.apply_mods`.
+
+    Parameters
+    ----------
+    peptides: list-like of str
+        stripped peptide sequences
+    modifications: list-like of list of str
+        MS2PIP-style formatted modification lists, split on `|` (e.g.
+        `["0", "Acetyl", "2", "Oxidation"]`)
+    ptm_ids: dict
+        modification name -> modification id mapping
+
+    Returns
+    -------
+    encoded_peptides, encoded_modpeptides: tuple(np.ndarray, np.ndarray)
+        `np.uint16` arrays of shape `(len(peptides), max peptide length + 2)`
+
+    """
+    peptides = list(peptides)
+    lengths = np.array([len(peptide) for peptide in peptides], dtype=np.intp)
+    shape = (len(peptides), lengths.max(initial=0) + 2)
+
+    # Encode all residues at once
+    amino_acid_ids, rows = _lookup_residues(peptides, _AA_LUT)
+    offsets = np.cumsum(lengths) - lengths
+    columns = np.arange(len(amino_acid_ids)) - np.repeat(offsets, lengths)
+    encoded_peptides = np.zeros(shape, dtype=np.uint16)
+    encoded_peptides[rows, columns + 1] = amino_acid_ids
+
+    # Collect all modification positions and set them at once
+    mod_rows, mod_columns, mod_ids = [], [], []
+    for i, (mods, length) in enumerate(zip(modifications, lengths)):
+        positions, ids = _parse_modifications(mods, length, ptm_ids)
+        mod_rows.extend([i] * len(positions))
+        mod_columns.extend(positions)
+        mod_ids.extend(ids)
+    encoded_modpeptides = encoded_peptides.copy()
+    encoded_modpeptides[mod_rows, mod_columns] = mod_ids
+
+    return encoded_peptides, encoded_modpeptides
+
 
 def write_amino_acid_masses():
     # Includes fixed/variable information for Omega compatibility
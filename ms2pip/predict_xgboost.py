@@ -4,7 +4,8 @@ import hashlib
 import logging
 import os
 import urllib.request
-from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 import numpy as np
 import xgboost as xgb
@@ -13,6 +14,8 @@ from ms2pip.exceptions import InvalidXGBoostModelError
 
 logger = logging.getLogger(__name__)
 
+MODEL_URL = "http://genesis.ugent.be/uvpublicdata/ms2pip/"
+
 
 def get_predictions_xgb(features, num_ions, model_params, model_dir, num_cpu=1):
     """
@@ -32,27 +35,33 @@ def get_predictions_xgb(features, num_ions, model_params, model_dir, num_cpu=1):
         Number of CPUs to use in multiprocessing
 
     """
-    # Init models
-    xgboost_models = initialize_xgb_models(
-        model_params["xgboost_model_files"],
-        model_dir,
-        num_cpu,
-    )
+    model_files = model_params["xgboost_model_files"]
+    nthread = max(num_cpu // len(model_files), 1)
 
+    # Load models and predict concurrently for all ion types; XGBoost releases the GIL
     logger.debug("Predicting intensities from XGBoost model files...")
+    with ThreadPoolExecutor(max_workers=len(model_files)) as executor:
+        futures = {
+            ion_type: executor.submit(
+                _load_and_predict,
+                os.path.join(model_dir, model_file),
+                features,
+                nthread,
+            )
+            for ion_type, model_file in model_files.items()
+        }
+        preds_per_ion_type = {
+            ion_type: future.result() for ion_type, future in futures.items()
+        }
+
+    # Split into views for each peptide
+    split_indices = np.cumsum(num_ions[:-1])
     preds_list = []
-    for ion_type, xgb_model in xgboost_models.items():
-        # Get predictions from XGBoost model
-        preds = xgb_model.predict(features)
-        xgb_model.__del__()
-
-        # Reshape into arrays for each peptide
-        preds = _split_list_by_lengths(preds, num_ions)
+    for ion_type, preds in preds_per_ion_type.items():
+        preds = np.split(preds.astype(np.float32, copy=False), split_indices)
         if ion_type in ["x", "y", "y2", "z"]:
-            preds = [np.array(x[::-1], dtype=np.float32) for x in preds]
-        elif ion_type in ["a", "b", "b2", "c"]:
-            preds = [np.array(x, dtype=np.float32) for x in preds]
-        else:
+            preds = [x[::-1] for x in preds]
+        elif ion_type not in ["a", "b", "b2", "c"]:
             raise ValueError(f"Unsupported ion_type: {ion_type}")
         preds_list.append(preds)
 
@@ -60,9 +69,30 @@ def get_predictions_xgb(features, num_ions, model_params, model_dir, num_cpu=1):
     return predictions
 
 
-def _split_list_by_lengths(list_in, lengths):
-    list_in = iter(list_in)
-    return [list(islice(list_in, elem)) for elem in lengths]
+def _load_and_predict(model_file, features, nthread):
+    """Load XGBoost model from file and get predictions for feature vectors."""
+    # XGBoost configuration is thread-local, so set verbosity in this worker thread
+    with xgb.config_context(verbosity=0):
+        xgb_model = _load_booster(model_file, nthread)
+        return xgb_model.predict(features)
+
+
+def _load_booster(model_file, nthread):
+    """Load XGBoost model from file, reusing the model if it was loaded before."""
+    return _load_booster_cached(model_file, os.path.getmtime(model_file), nthread)
+
+
+@lru_cache(maxsize=16)
+def _load_booster_cached(model_file, mtime, nthread):
+    """
+    Load XGBoost model from file. `mtime` is only part of the cache key, so that
+    the model is reloaded when the file is replaced, e.g. by a new download.
+    """
+    logger.debug(f"Initializing model from file: `{model_file}`")
+    xgb_model = xgb.Booster({"nthread": nthread})
+    xgb_model.load_model(model_file)
+    xgb_model.set_param({"nthread": nthread})
+    return xgb_model
 
 
 def check_model_presence(model, model_hash, model_dir):
@@ -75,27 +105,39 @@ def check_model_presence(model, model_hash, model_dir):
 
 def download_model(model, model_hash, model_dir):
     """Download the xgboost model from the Genesis server."""
-    if not os.path.isdir(model_dir):
-        os.mkdir(model_dir)
+    os.makedirs(model_dir, exist_ok=True)
     filename = os.path.join(model_dir, model)
+    partial_filename = filename + ".part"
 
+    # Hash while streaming to disk, and only move complete, valid files into place
     logger.info(f"Downloading {model} to {filename}...")
-    urllib.request.urlretrieve(
-        os.path.join("http://genesis.ugent.be/uvpublicdata/ms2pip/", model), filename
-    )
-    if not check_model_integrity(filename, model_hash):
+    sha1_hash = hashlib.sha1()
+    try:
+        with urllib.request.urlopen(MODEL_URL + model) as response, open(
+            partial_filename, "wb"
+        ) as model_file:
+            for chunk in iter(lambda: response.read(1024 * 1024), b""):
+                model_file.write(chunk)
+                sha1_hash.update(chunk)
+    except BaseException:
+        if os.path.isfile(partial_filename):
+            os.remove(partial_filename)
+        raise
+    if sha1_hash.hexdigest() != model_hash:
+        os.remove(partial_filename)
         raise InvalidXGBoostModelError()
+    os.replace(partial_filename, filename)
 
 
 def check_model_integrity(filename, model_hash):
     """Check that models are correctly downloaded."""
-    sha1_hash = hashlib.sha1()
     with open(filename, "rb") as model_file:
-        while True:
-            chunk = model_file.read(16 * 1024)
-            if not chunk:
-                break
-            sha1_hash.update(chunk)
+        if hasattr(hashlib, "file_digest"):  # Python >= 3.11
+            sha1_hash = hashlib.file_digest(model_file, "sha1")
+        else:
+            sha1_hash = hashlib.sha1()
+            for chunk in iter(lambda: model_file.read(1024 * 1024), b""):
+                sha1_hash.update(chunk)
     if sha1_hash.hexdigest() == model_hash:
         return True
     else:
@@ -105,11 +147,17 @@ def check_model_integrity(filename, model_hash):
 
 def validate_requested_xgb_model(xgboost_model_files, xgboost_model_hashes, model_dir):
     """Validate requested XGBoost models, and download if necessary"""
-    for _, model_file in xgboost_model_files.items():
-        if not check_model_presence(
-            model_file, xgboost_model_hashes[model_file], model_dir
-        ):
-            download_model(model_file, xgboost_model_hashes[model_file], model_dir)
+
+    def _validate(model_file):
+        model_hash = xgboost_model_hashes[model_file]
+        if not check_model_presence(model_file, model_hash, model_dir):
+            download_model(model_file, model_hash, model_dir)
+
+    # Check and download all models concurrently; hashing and downloading release
+    # the GIL
+    model_files = set(xgboost_model_files.values())
+    with ThreadPoolExecutor(max_workers=min(len(model_files), 4) or 1) as executor:
+        list(executor.map(_validate, model_files))
 
 
 def initialize_xgb_models(xgboost_model_files, model_dir, nthread) -> dict:
@@ -118,8 +166,5 @@ def initialize_xgb_models(xgboost_model_files, model_dir, nthread) -> dict:
     xgboost_models = {}
     for ion_type in xgboost_model_files.keys():
         model_file = os.path.join(model_dir, xgboost_model_files[ion_type])
-        logger.debug(f"Initializing model from file: `{model_file}`")
-        xgb_model = xgb.Booster({"nthread": nthread})
-        xgb_model.load_model(model_file)
-        xgboost_models[ion_type] = xgb_model
+        xgboost_models[ion_type] = _load_booster(model_file, nthread)
     return xgboost_models
@@ -15,7 +15,7 @@ from ms2pip.config_parser import ConfigParser
 from ms2pip.cython_modules import ms2pip_pyx
 from ms2pip.exceptions import InvalidModificationFormattingError, InvalidPeptideError
 from ms2pip.ms2pipC import MODELS, apply_mods
-from ms2pip.peptides import AMINO_ACID_IDS, Modifications, write_amino_acid_masses
+from ms2pip.peptides import Modifications, encode_peptide, write_amino_acid_masses
 from ms2pip.predict_xgboost import initialize_xgb_models, validate_requested_xgb_model
 
 logger = logging.getLogger("ms2pip")
@@ -112,9 +112,7 @@ class SinglePrediction:
             self._validate_sequence(peptide)
             self._validate_mod_string(modifications)
 
-        peptide = np.array(
-            [0] + [AMINO_ACID_IDS[x] for x in peptide] + [0], dtype=np.uint16
-        )
+        peptide = encode_peptide(peptide)
         modpeptide = apply_mods(peptide, modifications, self.mod_info.ptm_ids)
         model_id = MODELS[model]["id"]
         peaks_version = MODELS[model]["peaks_version"]
@@ -0,0 +1,21 @@
+import os
+
+import pytest
+
+from ms2pip.peptides import Modifications, write_amino_acid_masses
+
+
+@pytest.fixture(scope="session")
+def ms2pip_files():
+    """Amino acid and modification files for ms2pip_init, and the PTM ID mapping."""
+    mods = Modifications()
+    mods.add_from_ms2pip_modstrings(["Oxidation,15.994915,opt,M"], mod_type="ptm")
+    mods.add_from_ms2pip_modstrings([], mod_type="sptm")
+    files = [
+        write_amino_acid_masses(),
+        mods.write_modifications_file(mod_type="ptm"),
+        mods.write_modifications_file(mod_type="sptm"),
+    ]
+    yield files, mods.ptm_ids
+    for filename in files:
+        os.remove(filename)
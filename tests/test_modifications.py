@@ -1,4 +1,14 @@
+import numpy as np
+import pytest
+from pyteomics import mass
+
 import ms2pip.peptides
+from ms2pip.exceptions import (
+    InvalidAminoAcidError,
+    InvalidModificationFormattingError,
+    UnknownModificationError,
+)
+from ms2pip.ms2pipC import apply_mods
 
 
 class TestModifications:
@@ -27,3 +37,99 @@ class TestModifications:
             "Acetyl,42.010565,opt,N-term",
         ])
         assert mods.mass_shifts["Acetyl"] == 42.010565
+
+    def test_get_ptm_ids(self):
+        mods = ms2pip.peptides.Modifications()
+        assert mods.ptm_ids == {}
+
+        # Test cache clear after adding new modifications
+        mods.add_from_ms2pip_modstrings([
+            "Oxidation,15.994915,opt,M"
+        ])
+        assert mods.ptm_ids == {"Oxidation": 38}
+        assert mods.mass_shift_vector[38] == 15.994915
+
+    def test_calc_precursor_mz_batch(self):
+        mods = ms2pip.peptides.Modifications()
+        mods.add_from_ms2pip_modstrings([
+            "Oxidation,15.994915,opt,M",
+            "Acetyl,42.010565,opt,N-term",
+        ])
+        peptides = ["ACDMK", "PEPTIDE", "MMMK"]
+        modifications = ["-", "0|Acetyl", "0|Acetyl|1|Oxidation|3|Oxidation"]
+        charges = [2, 3, 1]
+
+        prec_masses, prec_mzs = mods.calc_precursor_mz_batch(
+            peptides, modifications, charges
+        )
+        for i, args in enumerate(zip(peptides, modifications, charges)):
+            prec_mass, prec_mz = mods.calc_precursor_mz(*args)
+            assert prec_masses[i] == pytest.approx(prec_mass)
+            assert prec_mzs[i] == pytest.approx(prec_mz)
+
+    def test_calc_peptide_masses_lowercase(self):
+        masses = ms2pip.peptides.calc_peptide_masses(["PEPTIDE", "peptide", "PepTide"])
+        assert masses[0] == pytest.approx(mass.fast_mass("PEPTIDE"))
+        assert masses[1] == masses[2] == masses[0]
+
+    def test_calc_peptide_masses_invalid(self):
+        with pytest.raises(InvalidAminoAcidError) as excinfo:
+            ms2pip.peptides.calc_peptide_masses(["ACDMK", "PEPTÏDE", "MMMK"])
+        assert excinfo.value.args == ("PEPTÏDE",)
+
+
+class TestEncodePeptide:
+    def test_encode_peptide(self):
+        encoded = ms2pip.peptides.encode_peptide("ACDEIK")
+        assert encoded.dtype == np.uint16
+        assert encoded.tolist() == [0, 0, 1, 2, 3, 7, 8, 0]
+
+    def test_encode_peptide_leucine_lowercase(self):
+        assert (
+            ms2pip.peptides.encode_peptide("PeptLde").tolist()
+            == ms2pip.peptides.encode_peptide("PEPTIDE").tolist()
+        )
+
+    def test_encode_peptide_invalid(self):
+        with pytest.raises(InvalidAminoAcidError):
+            ms2pip.peptides.encode_peptide("PEPTIDEX")
+
+    def test_encode_peptidoforms(self):
+        ptm_ids = {"Oxidation": 38, "Acetyl": 39, "Amidated": 40}
+        peptides, modpeptides = ms2pip.peptides.encode_peptidoforms(
+            ["ACDEIK", "MK"],
+            [["0", "Acetyl", "1", "Oxidation"], ["-1", "Amidated"]],
+            ptm_ids,
+        )
+        assert peptides.dtype == modpeptides.dtype == np.uint16
+        assert peptides[0].tolist() == ms2pip.peptides.encode_peptide("ACDEIK").tolist()
+        assert peptides[1, :4].tolist() == ms2pip.peptides.encode_peptide("MK").tolist()
+        assert modpeptides[0].tolist() == [39, 38, 1, 2, 3, 7, 8, 0]
+        assert modpeptides[1, :4].tolist() == [0, 9, 8, 40]
+
+    def test_encode_peptidoforms_invalid(self):
+        with pytest.raises(InvalidAminoAcidError) as excinfo:
+            ms2pip.peptides.encode_peptidoforms(
+                ["ACDEIK", "PEPTÏDE", "MK"], [["-"]] * 3, {}
+            )
+        assert excinfo.value.args == ("PEPTÏDE",)
+
+    @pytest.mark.parametrize(
+        "mods, exception",
+        [
+            ("0|Acetyl|1", InvalidModificationFormattingError),
+            ("0|Phospho", UnknownModificationError),
+            ("9|Oxidation", InvalidModificationFormattingError),
+            ("-10|Oxidation", InvalidModificationFormattingError),
+        ],
+    )
+    def test_encode_peptidoforms_apply_mods_invalid(self, mods, exception):
+        # Batch and single-peptide modification parsing raise the same errors
+        ptm_ids = {"Oxidation": 38, "Acetyl": 39}
+        with pytest.raises(exception) as batch_excinfo:
+            ms2pip.peptides.encode_peptidoforms(
+                ["MK", "ACDEIK"], [["-"], mods.split("|")], ptm_ids
+            )
+        with pytest.raises(exception) as single_excinfo:
+            apply_mods(ms2pip.peptides.encode_peptide("ACDEIK"), mods, ptm_ids)
+        assert batch_excinfo.value.args == single_excinfo.value.args
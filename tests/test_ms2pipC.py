@@ -0,0 +1,26 @@
+import pandas as pd
+import pytest
+
+from ms2pip.ms2pipC import process_peptides
+
+
+class TestProcessPeptides:
+    @pytest.mark.parametrize("model", ["HCD2019", "HCD2021"])
+    @pytest.mark.parametrize(
+        "peptide, num_peptides",
+        [("ACDEK", 0), ("A" * 101, 1)],
+        ids=["empty", "all_too_long"],
+    )
+    def test_process_peptides_no_peptides(
+        self, ms2pip_files, model, peptide, num_peptides
+    ):
+        files, ptm_ids = ms2pip_files
+        data = pd.DataFrame(
+            {"spec_id": ["pep"], "modifications": "-", "peptide": peptide, "charge": 2}
+        ).iloc[:num_peptides]
+        pepid_buf, peplen_buf, charge_buf, mz_buf, _, prediction_buf, vector_buf = (
+            process_peptides(0, data, *files, ptm_ids, model)
+        )
+        assert pepid_buf == peplen_buf == charge_buf == prediction_buf == []
+        assert sum(len(mzs) for mzs in mz_buf) == 0
+        assert sum(len(vectors) for vectors in vector_buf) == 0
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from ms2pip.cython_modules import ms2pip_pyx
+from ms2pip.ms2pipC import apply_mods
+from ms2pip.peptides import encode_peptide
+
+
+@pytest.fixture
+def ptm_ids(ms2pip_files):
+    files, ptm_ids = ms2pip_files
+    ms2pip_pyx.ms2pip_init(*files)
+    return ptm_ids
+
+
+class TestGetVectorInto:
+    def test_get_vector_into(self, ptm_ids):
+        peptide = encode_peptide("ACDMEK")
+        modpeptide = apply_mods(peptide, "4|Oxidation", ptm_ids)
+        expected = np.array(ms2pip_pyx.get_vector(peptide, modpeptide, 2))
+
+        out = np.empty(expected.shape, dtype=np.uint16)
+        ms2pip_pyx.get_vector_into(peptide, modpeptide, 2, out)
+        np.testing.assert_array_equal(out, expected)
+
+    def test_get_vector_into_wrong_shape(self, ptm_ids):
+        peptide = encode_peptide("ACDMEK")
+        num_features = len(ms2pip_pyx.get_vector(peptide, peptide, 2)[0])
+        for shape in [(4, num_features), (5, num_features + 1)]:
+            with pytest.raises(ValueError):
+                ms2pip_pyx.get_vector_into(
+                    peptide, peptide, 2, np.empty(shape, dtype=np.uint16)
+                )
@@ -0,0 +1,134 @@
+import hashlib
+import io
+import os
+
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from ms2pip import predict_xgboost
+from ms2pip.exceptions import InvalidXGBoostModelError
+
+MODEL_CONTENT = b"model" * 1000
+
+
+class _FailingResponse(io.BytesIO):
+    def read(self, size=-1):
+        if self.tell() > 0:
+            raise ConnectionResetError()
+        return super().read(100)
+
+
+class TestGetPredictionsXGB:
+    def test_split_and_reverse(self, monkeypatch):
+        # Predictions per ion type for two peptides, with 2 and 3 ions per series
+        preds = {
+            "b.xgboost": np.array([0, 1, 2, 3, 4], dtype=np.float64),
+            "y.xgboost": np.array([10, 11, 12, 13, 14], dtype=np.float64),
+        }
+        monkeypatch.setattr(
+            predict_xgboost,
+            "_load_and_predict",
+            lambda model_file, features, nthread: preds[os.path.basename(model_file)],
+        )
+        model_params = {"xgboost_model_files": {"b": "b.xgboost", "y": "y.xgboost"}}
+
+        predictions = predict_xgboost.get_predictions_xgb(
+            None, [2, 3], model_params, "models"
+        )
+
+        expected = [
+            [[0, 1], [11, 10]],
+            [[2, 3, 4], [14, 13, 12]],
+        ]
+        assert len(predictions) == len(expected)
+        for peptide_preds, peptide_expected in zip(predictions, expected):
+            assert len(peptide_preds) == len(peptide_expected)
+            for ion_preds, ion_expected in zip(peptide_preds, peptide_expected):
+                assert ion_preds.dtype == np.float32
+                np.testing.assert_array_equal(ion_preds, ion_expected)
+
+
+def _train_booster(model_file, num_boost_round=1):
+    features = np.arange(20, dtype=np.float32).reshape(10, 2)
+    dtrain = xgb.DMatrix(features, label=features[:, 0])
+    xgb.train({"verbosity": 0}, dtrain, num_boost_round=num_boost_round).save_model(
+        str(model_file)
+    )
+
+
+class TestLoadBooster:
+    def test_load_booster_cached(self, tmp_path):
+        model_file = tmp_path / "b.xgboost"
+        _train_booster(model_file)
+        booster = predict_xgboost._load_booster(str(model_file), 1)
+        assert predict_xgboost._load_booster(str(model_file), 1) is booster
+
+    def test_load_booster_replaced_file(self, tmp_path):
+        model_file = tmp_path / "b.xgboost"
+        _train_booster(model_file)
+        booster = predict_xgboost._load_booster(str(model_file), 1)
+
+        # Replace model file with a different model and a newer modification time
+        _train_booster(model_file, num_boost_round=2)
+        mtime = os.path.getmtime(model_file) + 10
+        os.utime(model_file, (mtime, mtime))
+        reloaded_booster = predict_xgboost._load_booster(str(model_file), 1)
+        assert reloaded_booster is not booster
+        assert reloaded_booster.num_boosted_rounds() == 2
+
+
+class TestDownloadModel:
+    def _patch_urlopen(self, monkeypatch, response):
+        monkeypatch.setattr(
+            predict_xgboost.urllib.request, "urlopen", lambda url: response
+        )
+
+    def test_download_model(self, tmp_path, monkeypatch):
+        self._patch_urlopen(monkeypatch, io.BytesIO(MODEL_CONTENT))
+        model_hash = hashlib.sha1(MODEL_CONTENT).hexdigest()
+        predict_xgboost.download_model("b.xgboost", model_hash, str(tmp_path))
+        assert os.listdir(tmp_path) == ["b.xgboost"]
+        assert (tmp_path / "b.xgboost").read_bytes() == MODEL_CONTENT
+
+    def test_download_model_invalid_hash(self, tmp_path, monkeypatch):
+        self._patch_urlopen(monkeypatch, io.BytesIO(MODEL_CONTENT))
+        with pytest.raises(InvalidXGBoostModelError):
+            predict_xgboost.download_model("b.xgboost", "invalid", str(tmp_path))
+        assert os.listdir(tmp_path) == []
+
+    def test_download_model_interrupted(self, tmp_path, monkeypatch):
+        self._patch_urlopen(monkeypatch, _FailingResponse(MODEL_CONTENT))
+        model_hash = hashlib.sha1(MODEL_CONTENT).hexdigest()
+        with pytest.raises(ConnectionResetError):
+            predict_xgboost.download_model("b.xgboost", model_hash, str(tmp_path))
+        assert os.listdir(tmp_path) == []
+
+
+class TestValidateRequestedXGBModel:
+    def test_download_missing_models_once(self, monkeypatch):
+        present_models = {"b.xgboost"}
+        downloaded_models = []
+        monkeypatch.setattr(
+            predict_xgboost,
+            "check_model_presence",
+            lambda model, model_hash, model_dir: model in present_models,
+        )
+        monkeypatch.setattr(
+            predict_xgboost,
+            "download_model",
+            lambda model, model_hash, model_dir: downloaded_models.append(model),
+        )
+
+        # Ion types y and y2 share a model file
+        model_files = {
+            "b": "b.xgboost",
+            "c": "c.xgboost",
+            "y": "y.xgboost",
+            "y2": "y.xgboost",
+        }
+        model_hashes = {model: "hash" for model in model_files.values()}
+        predict_xgboost.validate_requested_xgb_model(
+            model_files, model_hashes, "models"
+        )
+        assert sorted(downloaded_models) == ["c.xgboost", "y.xgboost"]
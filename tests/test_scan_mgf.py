@@ -0,0 +1,101 @@
+import pandas as pd
+import pytest
+
+from conversion_tools import scan_mgf
+
+TEST_MGF = """BEGIN IONS
+PEPMASS=500.0
+CHARGE=2+
+TITLE=spec_1
+100.1 10.0
+200.2 20.0
+END IONS
+BEGIN IONS
+PEPMASS=600.0
+CHARGE=2+
+TITLE=spec_2
+300.3 30.0
+END IONS
+BEGIN IONS
+PEPMASS=700.0
+CHARGE=3+
+TITLE=spec_3
+400.4 40.0
+END IONS
+"""
+
+
+requires_hyperscan = pytest.mark.skipif(
+    not scan_mgf.USE_HYPERSCAN, reason="Hyperscan is not installed"
+)
+USE_HYPERSCAN = [False, pytest.param(True, marks=requires_hyperscan)]
+
+
+def _run_scan_mgf(tmp_path, mgf, spec_ids):
+    (tmp_path / "run.mgf").write_text(mgf)
+    peprec = pd.DataFrame({"spec_id": spec_ids, "mgf_filename": "run.mgf"})
+    outname = tmp_path / "out.mgf"
+    scan_mgf.scan_mgf(peprec, str(tmp_path), outname=str(outname))
+    return outname.read_text()
+
+
+class TestScanMGF:
+    @pytest.mark.parametrize("use_hyperscan", USE_HYPERSCAN)
+    def test_matching_spectra(self, tmp_path, monkeypatch, use_hyperscan):
+        monkeypatch.setattr(scan_mgf, "USE_HYPERSCAN", use_hyperscan)
+        # Full spectra are written, including the header lines before the title
+        assert _run_scan_mgf(tmp_path, TEST_MGF, ["spec_3", "spec_1"]) == (
+            "BEGIN IONS\nPEPMASS=500.0\nCHARGE=2+\nTITLE=spec_1\n"
+            "100.1 10.0\n200.2 20.0\nEND IONS\n\n"
+            "BEGIN IONS\nPEPMASS=700.0\nCHARGE=3+\nTITLE=spec_3\n"
+            "400.4 40.0\nEND IONS\n\n"
+        )
+
+    @pytest.mark.parametrize("use_hyperscan", USE_HYPERSCAN)
+    def test_no_matching_spectra(self, tmp_path, monkeypatch, use_hyperscan):
+        monkeypatch.setattr(scan_mgf, "USE_HYPERSCAN", use_hyperscan)
+        assert _run_scan_mgf(tmp_path, TEST_MGF, ["spec_4"]) == ""
+
+    @pytest.mark.parametrize("use_hyperscan", USE_HYPERSCAN)
+    def test_empty_mgf(self, tmp_path, monkeypatch, use_hyperscan):
+        monkeypatch.setattr(scan_mgf, "USE_HYPERSCAN", use_hyperscan)
+        assert _run_scan_mgf(tmp_path, "", ["spec_1"]) == ""
+
+    @pytest.mark.parametrize("use_hyperscan", USE_HYPERSCAN)
+    def test_numeric_spec_ids(self, tmp_path, monkeypatch, use_hyperscan):
+        # Numeric spec_ids, as read from a PEPREC file, match numeric MGF titles
+        mgf = TEST_MGF.replace("TITLE=spec_", "TITLE=")
+        monkeypatch.setattr(scan_mgf, "USE_HYPERSCAN", use_hyperscan)
+        assert _run_scan_mgf(tmp_path, mgf, [1, 2]).count("BEGIN IONS") == 2
+
+    @requires_hyperscan
+    def test_hyperscan_and_find_equal(self, tmp_path, monkeypatch):
+        mgf = TEST_MGF.replace("TITLE=spec_", "TITLE=")
+        results = []
+        for use_hyperscan in [False, True]:
+            monkeypatch.setattr(scan_mgf, "USE_HYPERSCAN", use_hyperscan)
+            results.append(_run_scan_mgf(tmp_path, mgf, [3, 1]))
+        assert results[0] == results[1] != ""
+
+    @pytest.mark.parametrize("use_hyperscan", USE_HYPERSCAN)
+    def test_title_on_first_line(self, tmp_path, monkeypatch, use_hyperscan):
+        # A title without preceding line is skipped, later spectra are still found
+        mgf = TEST_MGF[len("BEGIN IONS\nPEPMASS=500.0\nCHARGE=2+\n") :]
+        monkeypatch.setattr(scan_mgf, "USE_HYPERSCAN", use_hyperscan)
+        assert _run_scan_mgf(tmp_path, mgf, ["spec_1", "spec_3"]) == (
+            "BEGIN IONS\nPEPMASS=700.0\nCHARGE=3+\nTITLE=spec_3\n"
+            "400.4 40.0\nEND IONS\n\n"
+        )
+
+    @pytest.mark.parametrize("use_hyperscan", USE_HYPERSCAN)
+    def test_zero_intensity_peaks(self, tmp_path, monkeypatch, use_hyperscan):
+        # Only peaks with an intensity of exactly 0.0 are removed
+        mgf = (
+            "BEGIN IONS\nPEPMASS=500.0\nTITLE=spec_1\n"
+            "100.1 0.0\n200.2 10.0\n300.3 100.0\n400.4 0.0\nEND IONS\n"
+        )
+        monkeypatch.setattr(scan_mgf, "USE_HYPERSCAN", use_hyperscan)
+        assert _run_scan_mgf(tmp_path, mgf, ["spec_1"]) == (
+            "BEGIN IONS\nPEPMASS=500.0\nTITLE=spec_1\n"
+            "200.2 10.0\n300.3 100.0\nEND IONS\n\n"
+        )